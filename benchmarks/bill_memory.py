@@ -0,0 +1,119 @@
+"""
+Memory benchmark for bill conversion.
+
+Converts every bill of a congress with UnitedStatesBillScraper, holding on to the converted bills (as a consumer
+or the bill text download window would), and reports peak traced memory, the number of live allocations held
+by the converted bills, and peak RSS.
+
+    python benchmarks/bill_memory.py [--data-dir SCRAPED_DATA_DIR] [--congress 113] [--bills 10000]
+
+Without --data-dir a synthetic congress of --bills bills is generated in a temporary directory.
+"""
+import os
+import sys
+import json
+import random
+import shutil
+import argparse
+import resource
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pupa import settings
+
+
+SUBJECTS = ['Taxation', 'Health', 'Armed forces and national security', 'Education', 'Energy',
+            'Government operations and politics', 'Crime and law enforcement', 'Transportation and public works',
+            'Public lands and natural resources', 'Finance and financial sector', 'Congress', 'Immigration']
+ACTION_TYPES = ['action', 'referral', 'calendar', 'vote', 'vote2', 'vote-aux', 'enacted', 'topresident', 'signed']
+BILL_TYPES = ['hr', 'hres', 'hjres', 'hconres', 's', 'sres', 'sjres', 'sconres']
+VERSION_CODES = ['ih', 'rh', 'eh', 'is', 'rs', 'es', 'enr']
+
+
+def generate_congress(root, congress, bills, seed=0):
+    """
+    Writes a synthetic unitedstates/congress data tree for one congress under root.
+
+    @param root: scraped data directory to write to
+    @type root: string
+    @param congress: congress number
+    @type congress: int
+    @param bills: number of bills to generate
+    @type bills: int
+    @param seed: random seed
+    @type seed: int
+    @return: void
+    """
+    rnd = random.Random(seed)
+    legislators = [('Legislator, Number %d' % i, '%05d' % i) for i in range(540)]
+    for i in range(bills):
+        bill_type = BILL_TYPES[i % len(BILL_TYPES)]
+        number = str(i // len(BILL_TYPES) + 1)
+        bill_dir = os.path.join(root, 'data', str(congress), 'bills', bill_type, bill_type + number)
+        os.makedirs(bill_dir)
+        sponsor, *cosponsors = rnd.sample(legislators, rnd.randint(1, 30))
+        actions = [{'acted_at': '2013-%02d-%02dT12:00:00-05:00' % (rnd.randint(1, 12), rnd.randint(1, 28)),
+                    'type': rnd.choice(ACTION_TYPES),
+                    'text': 'Action %d on %s%s.' % (j, bill_type, number)}
+                   for j in range(rnd.randint(2, 40))]
+        data = {'bill_id': '%s%s-%d' % (bill_type, number, congress), 'bill_type': bill_type, 'number': number,
+                'congress': str(congress), 'official_title': 'To do thing %d, and for other purposes.' % i,
+                'url': 'http://thomas.loc.gov/cgi-bin/bdquery/z?d%d:%s%s:' % (congress, bill_type, number),
+                'subjects': rnd.sample(SUBJECTS, rnd.randint(1, 6)),
+                'summary': {'text': 'Summary of bill %d.' % i, 'as': 'Introduced', 'date': '2013-01-03'},
+                'titles': [{'title': 'Act %d' % i, 'type': 'short'}, {'title': 'To do thing %d.' % i, 'type': 'official'}],
+                'related_bills': [{'type': 'bill', 'bill_id': 'hr%d-%d' % (rnd.randint(1, 5000), congress)}],
+                'sponsor': {'name': sponsor[0], 'thomas_id': sponsor[1]},
+                'cosponsors': [{'name': name, 'thomas_id': thomas_id} for name, thomas_id in cosponsors],
+                'introduced_at': '2013-01-03', 'updated_at': '2013-12-31T00:00:00-05:00', 'actions': actions}
+        with open(os.path.join(bill_dir, 'data.json'), 'w') as f:
+            json.dump(data, f)
+        for code in rnd.sample(VERSION_CODES, rnd.randint(1, 3)):
+            version_dir = os.path.join(bill_dir, 'text-versions', code)
+            os.makedirs(version_dir)
+            url = 'http://www.gpo.gov/fdsys/pkg/BILLS-%d%s%s%s/' % (congress, bill_type, number, code)
+            with open(os.path.join(version_dir, 'data.json'), 'w') as f:
+                json.dump({'issued_on': '2013-01-03', 'version_code': code,
+                           'urls': {'pdf': url + 'pdf', 'html': url + 'html', 'xml': url + 'xml'}}, f)
+
+
+def run(data_dir, congress):
+    settings.SCRAPED_DATA_DIR = data_dir
+    from unitedstates.bill import UnitedStatesBillScraper
+
+    scraper = UnitedStatesBillScraper.__new__(UnitedStatesBillScraper)
+    scraper.upstream_ran = True
+    scraper.congress_range = (congress, congress)
+    scraper.bill_index_path = os.path.join(data_dir, 'benchmark-bills.sqlite')
+
+    tracemalloc.start()
+    bills = list(scraper.scrape())
+    current, peak = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    tracemalloc.stop()
+
+    print('bills converted:        {0}'.format(len(bills)))
+    print('traced memory held:     {0:.1f} MiB'.format(current / 2 ** 20))
+    print('traced memory peak:     {0:.1f} MiB'.format(peak / 2 ** 20))
+    print('live allocations:       {0}'.format(blocks))
+    print('peak RSS:               {0:.1f} MiB'.format(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure memory used by bill conversion.')
+    parser.add_argument('--data-dir', help='scraped data directory containing data/<congress>/bills')
+    parser.add_argument('--congress', type=int, default=113)
+    parser.add_argument('--bills', type=int, default=10000, help='bills to generate without --data-dir')
+    args = parser.parse_args()
+
+    if args.data_dir:
+        run(args.data_dir, args.congress)
+    else:
+        data_dir = tempfile.mkdtemp()
+        try:
+            generate_congress(data_dir, args.congress, args.bills)
+            run(data_dir, args.congress)
+        finally:
+            shutil.rmtree(data_dir)
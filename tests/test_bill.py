@@ -0,0 +1,53 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from pupa import settings
+
+from unitedstates.bill import UnitedStatesBillScraper
+
+
+class BillConversionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.old_data_dir = settings.SCRAPED_DATA_DIR
+        settings.SCRAPED_DATA_DIR = self.data_dir
+
+    def tearDown(self):
+        settings.SCRAPED_DATA_DIR = self.old_data_dir
+        shutil.rmtree(self.data_dir)
+
+    def write_bill(self, **overrides):
+        data = {'bill_id': 'hr1-113', 'bill_type': 'hr', 'number': '1', 'congress': '113',
+                'official_title': 'A bill', 'url': 'http://example.org/', 'subjects': ['Taxation'],
+                'summary': {'text': 'Summary', 'as': 'Introduced', 'date': '2013-01-03'}, 'titles': [],
+                'related_bills': [], 'sponsor': {'name': 'Smith, John', 'thomas_id': '00001'}, 'cosponsors': [],
+                'introduced_at': '2013-01-03',
+                'actions': [{'acted_at': '2013-01-03T12:00:00-05:00', 'type': 'referral', 'text': 'Referred'}]}
+        data.update(overrides)
+        bill_dir = os.path.join(self.data_dir, 'data', '113', 'bills', 'hr', 'hr1')
+        os.makedirs(bill_dir)
+        with open(os.path.join(bill_dir, 'data.json'), 'w') as f:
+            json.dump(data, f)
+
+    def scrape(self):
+        scraper = UnitedStatesBillScraper.__new__(UnitedStatesBillScraper)
+        scraper.upstream_ran = True
+        return list(scraper.scrape())
+
+    def test_null_values_are_not_interned(self):
+        self.write_bill(sponsor={'name': 'Smith, John', 'thomas_id': None},
+                        cosponsors=[{'name': 'Doe, Jane', 'thomas_id': None}],
+                        summary={'text': 'Summary', 'as': None, 'date': None},
+                        actions=[{'acted_at': '2013-01-03', 'type': None, 'text': 'Referred'}])
+        bills = self.scrape()
+        self.assertEqual(len(bills), 1)
+        self.assertEqual(len(bills[0].sponsorships), 2)
+        self.assertEqual(bills[0].actions[-1]['type'], [None])
+
+
+if __name__ == '__main__':
+    unittest.main()
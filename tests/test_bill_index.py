@@ -0,0 +1,85 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from pupa import settings
+
+from unitedstates.bill import UnitedStatesBillScraper
+from unitedstates.bill_index import BillIndex
+
+
+def bill_data(bill_type, number, congress='113', actions=(), related_bills=()):
+    return {'bill_id': '{0}{1}-{2}'.format(bill_type, number, congress), 'bill_type': bill_type, 'number': number,
+            'congress': congress, 'official_title': 'A bill', 'url': 'http://example.org/', 'subjects': [],
+            'summary': None, 'titles': [], 'sponsor': {'name': 'Smith, John', 'thomas_id': '00001'},
+            'cosponsors': [], 'introduced_at': '2013-01-03', 'updated_at': '2013-01-03T00:00:00-05:00',
+            'actions': [{'acted_at': acted_at, 'type': 'action', 'text': 'Action'} for acted_at in actions],
+            'related_bills': [{'type': 'bill', 'bill_id': bill_id} for bill_id in related_bills]}
+
+
+class BillIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.index = BillIndex(os.path.join(self.data_dir, 'bills.sqlite'))
+        self.index.add(bill_data('hr', '1', actions=['2013-01-03', '2013-06-01T10:00:00-04:00']), 'hr1', 'a')
+        self.index.add(bill_data('s', '5', actions=['2013-02-01']), 's5', 'b')
+        self.index.add(bill_data('hr', '1', congress='112', actions=['2011-01-05']), 'hr1-112', 'c')
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.data_dir)
+
+    def test_resolve(self):
+        self.assertEqual(self.index.resolve(['hr1-113', 's5-113', 'hr2-113']),
+                         {'hr1-113': {'identifier': 'HR 1', 'congress': '113'},
+                          's5-113': {'identifier': 'S 5', 'congress': '113'}})
+
+    def test_resolve_identifiers(self):
+        self.assertEqual(self.index.resolve_identifiers(['HR 1', 'S 5', 'HR 2'], '113'), {'HR 1', 'S 5'})
+        self.assertEqual(self.index.resolve_identifiers(['HR 1', 'S 5'], '112'), {'HR 1'})
+        self.assertTrue(self.index.has_congress('112'))
+        self.assertFalse(self.index.has_congress('111'))
+
+    def test_changed_since(self):
+        self.assertEqual([row[0] for row in self.index.changed_since('2013-02-01')], ['hr1-113', 's5-113'])
+        self.assertEqual(self.index.changed_since('2013-06-02'), [])
+
+
+class RelatedBillsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.old_data_dir = settings.SCRAPED_DATA_DIR
+        settings.SCRAPED_DATA_DIR = self.data_dir
+
+        # s5 was converted by an earlier run; hr9 is unknown everywhere
+        index = BillIndex()
+        index.add(bill_data('s', '5'), 's5', 'b')
+        index.close()
+
+        bill_dir = os.path.join(self.data_dir, 'data', '113', 'bills', 'hr', 'hr1')
+        os.makedirs(bill_dir)
+        with open(os.path.join(bill_dir, 'data.json'), 'w') as f:
+            json.dump(bill_data('hr', '1', related_bills=['s5-113', 'hr9-113']), f)
+
+    def tearDown(self):
+        settings.SCRAPED_DATA_DIR = self.old_data_dir
+        shutil.rmtree(self.data_dir)
+
+    def test_related_bills_kept_and_unconfirmed_reported(self):
+        scraper = UnitedStatesBillScraper.__new__(UnitedStatesBillScraper)
+        scraper.upstream_ran = True
+        bills = list(scraper.scrape(bill_types='hr'))
+
+        self.assertEqual(len(bills), 1)
+        self.assertEqual([(b['identifier'], b['legislative_session']) for b in bills[0].related_bills],
+                         [('S 5', '113'), ('HR 9', '113')])
+        self.assertEqual(bills[0].extras['unindexed-related-bills'],
+                         [{'identifier': 'HR 9', 'legislative_session': '113'}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import unittest
+from urllib.parse import urlparse
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from pupa import settings
+
+from unitedstates.bill import UnitedStatesBillScraper
+
+
+# path -> body served by the stand-in server; the pdf and html of each bill are the same document
+DOCUMENTS = {}
+for number in ('1', '2', '3'):
+    DOCUMENTS['/hr{0}.pdf'.format(number)] = 'text of hr{0}'.format(number).encode('utf-8')
+    DOCUMENTS['/hr{0}.htm'.format(number)] = 'text of hr{0}'.format(number).encode('utf-8')
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        self.server.requested.append(self.path)
+        body = DOCUMENTS.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class BillTextTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.old_data_dir = settings.SCRAPED_DATA_DIR
+        settings.SCRAPED_DATA_DIR = self.data_dir
+
+        self.server = HTTPServer(('127.0.0.1', 0), StandInHandler)
+        self.server.requested = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        base_url = 'http://127.0.0.1:{0}'.format(self.server.server_port)
+
+        # hr4 links to a document the server does not have
+        for number in ('1', '2', '3', '4'):
+            bill_dir = os.path.join(self.data_dir, 'data', '113', 'bills', 'hr', 'hr' + number)
+            os.makedirs(os.path.join(bill_dir, 'text-versions', 'ih'))
+            with open(os.path.join(bill_dir, 'data.json'), 'w') as f:
+                json.dump({'bill_id': 'hr{0}-113'.format(number), 'bill_type': 'hr', 'number': number,
+                           'congress': '113', 'official_title': 'A bill', 'url': 'http://example.org/',
+                           'subjects': [], 'summary': None, 'titles': [], 'related_bills': [],
+                           'sponsor': {'name': 'Smith, John', 'thomas_id': '00001'}, 'cosponsors': [],
+                           'introduced_at': '2013-01-03', 'actions': []}, f)
+            with open(os.path.join(bill_dir, 'text-versions', 'ih', 'data.json'), 'w') as f:
+                json.dump({'issued_on': '2013-01-03', 'version_code': 'ih',
+                           'urls': {'pdf': '{0}/hr{1}.pdf'.format(base_url, number),
+                                    'html': '{0}/hr{1}.htm'.format(base_url, number)}}, f)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        settings.SCRAPED_DATA_DIR = self.old_data_dir
+        shutil.rmtree(self.data_dir)
+
+    def scrape(self):
+        scraper = UnitedStatesBillScraper.__new__(UnitedStatesBillScraper)
+        scraper.upstream_ran = True
+        return list(scraper.scrape(fetch_text='true'))
+
+    def stored_files(self):
+        store_dir = os.path.join(self.data_dir, 'bill_texts')
+        return [name for _, _, files in os.walk(store_dir) for name in files]
+
+    def test_duplicates_stored_once_and_hashes_attached(self):
+        bills = self.scrape()
+        self.assertEqual(len(bills), 4)
+        self.assertEqual(len(self.stored_files()), 3)
+
+        for bill in bills:
+            for version in bill.versions:
+                for link in version['links']:
+                    body = DOCUMENTS.get(urlparse(link['url']).path)
+                    if body is None:
+                        self.assertNotIn('sha1', link)
+                    else:
+                        self.assertEqual(link['sha1'], hashlib.sha1(body).hexdigest())
+
+    def test_known_urls_skipped(self):
+        self.scrape()
+        self.assertEqual(len(self.server.requested), 8)
+
+        self.server.requested = []
+        bills = self.scrape()
+        # only the documents that could not be downloaded are requested again
+        self.assertEqual(sorted(self.server.requested), ['/hr4.htm', '/hr4.pdf'])
+        self.assertEqual(sum('sha1' in link for bill in bills for version in bill.versions
+                             for link in version['links']), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from unitedstates.images import LegislatorImages
+
+
+# portraits the stand-in server has; A000003 has none at all
+PORTRAITS = {'/450x550/A000001.jpg', '/225x275/A000002.jpg'}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+
+    def do_HEAD(self):
+        self.server.requested.append(self.path)
+        self.send_response(200 if self.path in PORTRAITS else 404)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class LegislatorImagesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.server = HTTPServer(('127.0.0.1', 0), StandInHandler)
+        self.server.requested = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.cache_dir)
+
+    def images(self):
+        images = LegislatorImages(os.path.join(self.cache_dir, 'images.json'))
+        images.BASE_URL = 'http://127.0.0.1:{0}/'.format(self.server.server_port)
+        return images
+
+    def test_preferred_existing_size_and_warm_cache(self):
+        images = self.images()
+        found = images.find(['A000001', 'A000002', 'A000003'])
+        images.save()
+        self.assertEqual(found, {'A000001': images.url('A000001', '450x550'),
+                                 'A000002': images.url('A000002', '225x275')})
+        # 3 at the preferred size, 2 at the next, 1 at the original
+        self.assertEqual(len(self.server.requested), 6)
+
+        self.server.requested = []
+        self.assertEqual(self.images().find(['A000001', 'A000002', 'A000003']), found)
+        self.assertEqual(self.server.requested, [])
+
+    def test_missing_portraits_trusted_for_months(self):
+        images = self.images()
+        images.find(['A000003'])
+        now = time.time()
+        for entry in images.cache.values():
+            self.assertFalse(entry['exists'])
+            self.assertGreaterEqual(entry['expires'] - now, LegislatorImages.MISSING_MAX_AGE / 2 - 60)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,18 +2,114 @@ import subprocess
 import os
 import json
 import re
+import hashlib
+import datetime
 import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
+from dateutil import parser as date_parser
 from pupa.scrape import Scraper, Bill
 from pupa import settings
 
 from . import constants
-from .util import find_files, datetime_to_date
+from .util import find_files, datetime_to_date, intern_str
+from .bill_index import BillIndex
+from .bill_text import BillTextStore
+
+
+class _Action(object):
+    """Compact intermediate record of a bill action."""
+    __slots__ = ('date', 'type', 'description')
+
+    def __init__(self, date, type, description):
+        self.date = date
+        self.type = type
+        self.description = description
+
+
+class _Sponsorship(object):
+    """Compact intermediate record of a bill sponsorship."""
+    __slots__ = ('name', 'thomas_id', 'primary')
+
+    def __init__(self, name, thomas_id, primary):
+        self.name = name
+        self.thomas_id = thomas_id
+        self.primary = primary
+
+
+class _Version(object):
+    """Compact intermediate record of one link of a bill text version."""
+    __slots__ = ('date', 'code', 'mimetype', 'url')
+
+    def __init__(self, date, code, mimetype, url):
+        self.date = date
+        self.code = code
+        self.mimetype = mimetype
+        self.url = url
+
+
+class _BillRecord(object):
+    """Compact intermediate record of a bill, read from unitedstates data and turned into a pupa Bill."""
+    __slots__ = ('identifier', 'congress', 'title', 'chamber', 'url', 'subjects', 'summary', 'titles',
+                 'related_bills', 'sponsorships', 'introduced_at', 'actions', 'versions', 'index_row')
+
+    def __init__(self, identifier, congress, title, chamber, url):
+        self.identifier = identifier
+        self.congress = congress
+        self.title = title
+        self.chamber = chamber
+        self.url = url
+        self.subjects = []
+        self.summary = None
+        self.titles = []
+        self.related_bills = []
+        self.sponsorships = []
+        self.introduced_at = None
+        self.actions = []
+        self.versions = []
+        self.index_row = None
+
 
 class UnitedStatesBillScraper(Scraper):
 
     BILL_SPLIT = re.compile("([a-zA-Z]+)([0-9]+)")
 
+    # scope of the scrape, pushed down to both the upstream run and the walk over its data tree.
+    # (first, last) congress, inclusive; either end may be None for the first congress with bill data or the
+    # current congress
+    congress_range = None
+    # bill types to convert, e.g. ['hr', 's']
+    bill_types = None
+    # only convert bills whose data.json was modified at or after this datetime
+    updated_since = None
+
+    # path of the local bill index, defaults to bills.sqlite in the scraped data directory
+    bill_index_path = None
+
+    # download the documents of every bill version into a BillTextStore and attach their hashes
+    fetch_text = False
+    # directory of the BillTextStore, defaults to bill_texts in the scraped data directory
+    text_store_dir = None
+    # number of concurrent document downloads
+    text_workers = 8
+
+    # set once the upstream unitedstates/congress run has happened for this scraper instance
+    upstream_ran = False
+
+    def prepare(self, **kwargs):
+        """
+        Runs the upstream unitedstates/congress scrapers ahead of conversion, so that a concurrent run
+        (see unitedstates.runner) can overlap this subprocess work with the other scrapers.
+
+        @param kwargs: the arguments scrape() will be called with, so the upstream run is scoped the same way
+        @type kwargs: dict
+        @return: void
+        """
+        self._set_scope(**kwargs)
+        self._run_unitedstates_bill_scraper()
+        self.upstream_ran = True
+
     def _run_unitedstates_bill_scraper(self):
         """
         Runs the unitedstates scrapers using the virtualenv and data path set in UnitedStates.
@@ -26,10 +122,10 @@ class UnitedStatesBillScraper(Scraper):
             us_congress_path = os.environ['US_CONGRESS_PATH']
             if not us_congress_path.endswith('/'): us_congress_path += '/'
             us_virtenv_python_bin_path = os.environ['US_VIRTENV_PYTHON_BIN_PATH']
-            commands = [
-                [us_virtenv_python_bin_path, us_congress_path + 'run', 'bills'],
-                [us_virtenv_python_bin_path, us_congress_path + 'run', 'bill_versions']
-            ]
+            commands = []
+            for options in self._upstream_options():
+                commands.append([us_virtenv_python_bin_path, us_congress_path + 'run', 'bills'] + options)
+                commands.append([us_virtenv_python_bin_path, us_congress_path + 'run', 'bill_versions'] + options)
             for cmd in commands:
                 process = subprocess.Popen(cmd, cwd=settings.SCRAPED_DATA_DIR)
                 process.wait()
@@ -38,104 +134,129 @@ class UnitedStatesBillScraper(Scraper):
             print('You must set environmental variables for the unitedstates/congress path (US_CONGRESS_PATH)'
                   'and the virtualenv python bin path (US_VIRTENV_PYTHON_BIN_PATH) for that project.')
 
+    def _upstream_options(self):
+        """
+        Translates the scope of the scrape into option lists for the unitedstates/congress run, one upstream
+        run per selected congress and bill type. With an updated_since the upstream runs in --fast mode, where
+        it only refetches bills that changed upstream.
+
+        @return: list of command line option lists
+        @rtype: list[list[string]]
+        """
+        common = ['--fast'] if self.updated_since is not None else []
+        congresses = [None]
+        if self.congress_range is not None:
+            first, last = self._congress_bounds()
+            congresses = list(range(first, last + 1))
+        bill_types = self.bill_types or [None]
+
+        option_lists = []
+        for congress in congresses:
+            for bill_type in bill_types:
+                options = list(common)
+                if congress is not None:
+                    options.append('--congress=' + str(congress))
+                if bill_type is not None:
+                    options.append('--bill_type=' + bill_type)
+                option_lists.append(options)
+        return option_lists
+
+    def _congress_bounds(self):
+        """
+        Resolves open ends of congress_range, so the upstream run and the walk over its data cover the same
+        congresses.
+
+        @return: (first, last) congress, inclusive
+        @rtype: tuple[int, int]
+        """
+        first, last = self.congress_range
+        if first is None:
+            first = constants.FIRST_BILL_CONGRESS
+        if last is None:
+            # the 1st congress began in 1789; each congress spans two years
+            last = (datetime.date.today().year - 1789) // 2 + 1
+        return first, last
+
+    def _congress_selected(self, congress):
+        if self.congress_range is None:
+            return True
+        first, last = self._congress_bounds()
+        return first <= congress <= last
+
+    def _bill_files(self):
+        """
+        Walks the scraped data tree (data/<congress>/bills/<bill type>/<bill>/data.json) and yields the bill
+        files within the scope of the scrape. Directories of other congresses and bill types are never listed,
+        and files older than updated_since are skipped on their modification time without being opened.
+
+        @return: generator for data.json paths
+        @rtype: generator[string]
+        """
+        updated_since = self.updated_since.timestamp() if self.updated_since is not None else None
+        data_dir = os.path.join(settings.SCRAPED_DATA_DIR, 'data')
+        for congress in _list_dirs(data_dir):
+            if not congress.isdigit() or not self._congress_selected(int(congress)):
+                continue
+            bills_dir = os.path.join(data_dir, congress, 'bills')
+            for bill_type in _list_dirs(bills_dir):
+                if self.bill_types and bill_type not in self.bill_types:
+                    continue
+                type_dir = os.path.join(bills_dir, bill_type)
+                for bill_dir in _list_dirs(type_dir):
+                    filename = os.path.join(type_dir, bill_dir, 'data.json')
+                    try:
+                        modified = os.stat(filename).st_mtime
+                    except OSError:
+                        continue
+                    if updated_since is None or modified >= updated_since:
+                        yield filename
+
     def _scrape_bills(self):
         """
         Does the following
 
         1) Scrapes bill data from unitedstates project and saves the data to path specified in UnitedStates module
         2) Iterates over bill data and converts each one to an OCD-compliant bill model.
-        3) Yields the OCD-compliant bill model instance
+        3) Records the bill in the local BillIndex so other scrapers can resolve references to it
+        4) Optionally downloads the bill's version documents (see fetch_text)
+        5) Yields the OCD-compliant bill model instance
 
         @return: generator for federal US bills in OCD-compliant format
         @rtype: generator
         """
 
-        # run scraper first to pull in all the bill data
-        self._run_unitedstates_bill_scraper()
+        # run scraper first to pull in all the bill data, unless prepare() already did
+        if not self.upstream_ran:
+            self._run_unitedstates_bill_scraper()
+        bill_index = BillIndex(self.bill_index_path)
+        try:
+            bills = self._convert_bills(bill_index)
+            if self.fetch_text:
+                bills = self._attach_texts(bills, bill_index)
+            yield from bills
+        finally:
+            bill_index.close()
+
+    def _convert_bills(self, bill_index):
+        """
+        Iterates over the scraped bill data, converting each data.json to a Bill and recording it in the index.
+
+        @param bill_index: index to record converted bills in
+        @type bill_index: BillIndex
+        @return: generator for federal US bills in OCD-compliant format
+        @rtype: generator
+        """
         # iterate over all the files and build and yield Bill objects
-        for filename in find_files(settings.SCRAPED_DATA_DIR, '.*/data/[0-9]+/bills/[^\/]+/[^\/]+/data.json'):
+        for filename in self._bill_files():
             try:
-                with open(filename) as json_file:
-                    json_data = json.load(json_file)
-
-                    # Initialize Object
-                    bill = Bill(constants.TYPE_MAP[json_data['bill_type']]['canonical'] + ' ' + json_data['number'],
-                                json_data['congress'],
-                                json_data['official_title'],
-                                chamber=constants.TYPE_MAP[json_data['bill_type']]['chamber']
-                    )
-
-                    # add source of data
-                    bill.add_source(json_data['url'], note='all')
-
-                    # add subjects
-                    for subject in json_data['subjects']:
-                        bill.add_subject(subject)
-
-                    # add summary
-                    if 'summary' in json_data and json_data['summary'] is not None:
-                        bill.add_abstract(json_data['summary']['text'],
-                                          json_data['summary']['as'],
-                                          json_data['summary']['date'])
-
-                    # add titles
-                    for item in json_data['titles']:
-                        bill.add_title(item['title'], item['type'])
-
-                    # add other/related Bills
-                    for b in json_data['related_bills']:
-                        if 'type' in b and b['type'] == 'bill':
-                            split = b['bill_id'].split('-')
-                            m = UnitedStatesBillScraper.BILL_SPLIT.match(split[0])
-
-                            bill.add_related_bill(constants.TYPE_MAP[m.group(1)]['canonical'] + ' ' + m.group(2),
-                                                  legislative_session=split[1],
-                                                  relation_type='companion')
-
-                    # add sponsor
-                    bill.add_sponsorship_by_identifier(json_data['sponsor']['name'], 'person', 'person', True,
-                                                       scheme='thomas_id', identifier=json_data['sponsor']['thomas_id'],
-                                                       chamber=constants.TYPE_MAP[json_data['bill_type']]['chamber'])
-
-                    # add cosponsors
-                    for cs in json_data['cosponsors']:
-                        bill.add_sponsorship_by_identifier(cs['name'], 'person', 'person', False,
-                                                           scheme='thomas_id', identifier=cs['thomas_id'],
-                                                           chamber=constants.TYPE_MAP[json_data['bill_type']]['chamber'])
-
-                    # add introduced_at and actions
-                    bill.add_action('date of introduction', datetime_to_date(json_data['introduced_at']),
-                                    chamber=constants.TYPE_MAP[json_data['bill_type']]['chamber'],
-                                    related_entities=[])
-
-                    # add other actions
-                    for action in json_data['actions']:
-                        bill.actions.append({'date': datetime_to_date(action['acted_at']),
-                                             'type': [action['type']],
-                                             'description': action['text'],
-                                             'actor': constants.TYPE_MAP[json_data['bill_type']]['chamber'],
-                                             'related_entities': []
-                                             })
-
-                    # add bill versions
-                    for version_path in find_files(os.path.join(settings.SCRAPED_DATA_DIR,
-                                                   'data', bill.legislative_session, 'bills', json_data['bill_type'],
-                                                   json_data['bill_type'] + json_data['number'],
-                                                   'text-versions'), '/.*/*\.json'):
-                        try:
-                            with open(version_path) as version_file:
-                                version_json_data = json.load(version_file)
-                                for k, v in version_json_data['urls'].items():
-                                    bill.versions.append({'date': datetime_to_date(version_json_data['issued_on']),
-                                      'type': version_json_data['version_code'],
-                                      'name': constants.VERSION_MAP[version_json_data['version_code']],
-                                      'links': [{'mimetype': k, 'url': v}]})
-                        except IOError:
-                            print("Unable to open or parse file with path " + version_path)
-                            continue
-
-                    # finally yield bill object
-                    yield bill
+                record = self._read_bill(filename, bill_index)
+                bill = self._build_bill(record)
+
+                # only index bills that were built, so references to the index never point at a missing bill
+                bill_index.add_row(record.index_row)
+
+                # finally yield bill object
+                yield bill
 
             except IOError:
                 print("Unable to open file with path " + filename)
@@ -150,5 +271,247 @@ class UnitedStatesBillScraper(Scraper):
                 print(traceback.format_exc())
                 continue
 
-    def scrape(self):
-        yield from self._scrape_bills()
\ No newline at end of file
+    def _read_bill(self, filename, bill_index):
+        """
+        Reads a bill's data.json and text versions into a compact _BillRecord, including the bill's BillIndex row.
+
+        The decoded JSON is dropped as soon as the record is built. Values that recur across bills (chambers,
+        version names, action types, dates, subjects, sponsor names and thomas ids) are interned, so every bill
+        held in memory shares one copy of each.
+
+        @param filename: path of the bill's data.json
+        @type filename: string
+        @param bill_index: index to resolve related bills against
+        @type bill_index: BillIndex
+        @return: compact intermediate record of the bill
+        @rtype: _BillRecord
+        """
+        with open(filename, 'rb') as json_file:
+            contents = json_file.read()
+        json_data = json.loads(contents.decode('utf-8'))
+
+        bill_type = intern_str(json_data['bill_type'])
+        chamber = constants.TYPE_MAP[bill_type]['chamber']
+        record = _BillRecord(constants.TYPE_MAP[bill_type]['canonical'] + ' ' + json_data['number'],
+                             intern_str(json_data['congress']), json_data['official_title'], chamber, json_data['url'])
+
+        record.subjects = [intern_str(subject) for subject in json_data['subjects']]
+
+        summary = json_data.get('summary')
+        if summary is not None:
+            record.summary = (summary['text'], intern_str(summary['as']), intern_str(summary['date']))
+
+        record.titles = [(item['title'], intern_str(item['type'])) for item in json_data['titles']]
+
+        record.related_bills = self._resolve_related_bills(
+            [b['bill_id'] for b in json_data['related_bills'] if 'type' in b and b['type'] == 'bill'], bill_index)
+
+        sponsor = json_data['sponsor']
+        record.sponsorships.append(_Sponsorship(intern_str(sponsor['name']), intern_str(sponsor['thomas_id']), True))
+        for cs in json_data['cosponsors']:
+            record.sponsorships.append(_Sponsorship(intern_str(cs['name']), intern_str(cs['thomas_id']), False))
+
+        record.introduced_at = intern_str(datetime_to_date(json_data['introduced_at']))
+        record.actions = [_Action(intern_str(datetime_to_date(action['acted_at'])), intern_str(action['type']),
+                                  action['text'])
+                          for action in json_data['actions']]
+
+        for version_path in find_files(os.path.join(settings.SCRAPED_DATA_DIR,
+                                       'data', record.congress, 'bills', bill_type,
+                                       bill_type + json_data['number'],
+                                       'text-versions'), '/.*/*\.json'):
+            try:
+                with open(version_path) as version_file:
+                    version_json_data = json.load(version_file)
+                    date = intern_str(datetime_to_date(version_json_data['issued_on']))
+                    code = intern_str(version_json_data['version_code'])
+                    for k, v in version_json_data['urls'].items():
+                        record.versions.append(_Version(date, code, intern_str(k), v))
+            except IOError:
+                print("Unable to open or parse file with path " + version_path)
+                continue
+
+        record.index_row = BillIndex.row(json_data, filename, hashlib.sha1(contents).hexdigest())
+        return record
+
+    def _resolve_related_bills(self, bill_ids, bill_index):
+        """
+        Parses related bill ids and checks them against the BillIndex in one query. Every related bill is kept,
+        as the index may be stale or cover only part of a congress; the index only marks the ones it confirms.
+
+        @param bill_ids: unitedstates bill ids of related bills, e.g. hr1234-113
+        @type bill_ids: list[string]
+        @param bill_index: index of converted bills
+        @type bill_index: BillIndex
+        @return: list of (OCD identifier, congress, confirmed by the index) tuples
+        @rtype: list[tuple]
+        """
+        known = bill_index.resolve(bill_ids)
+        related_bills = []
+        for bill_id in bill_ids:
+            split = bill_id.split('-')
+            m = UnitedStatesBillScraper.BILL_SPLIT.match(split[0])
+            related_bills.append((constants.TYPE_MAP[m.group(1)]['canonical'] + ' ' + m.group(2),
+                                  intern_str(split[1]), bill_id in known))
+        return related_bills
+
+    def _build_bill(self, record):
+        """
+        Builds the OCD-compliant Bill from a _BillRecord.
+
+        @param record: compact intermediate record of the bill
+        @type record: _BillRecord
+        @return: OCD-compliant bill
+        @rtype: Bill
+        """
+        # Initialize Object
+        bill = Bill(record.identifier, record.congress, record.title, chamber=record.chamber)
+
+        # add source of data
+        bill.add_source(record.url, note='all')
+
+        # add subjects
+        for subject in record.subjects:
+            bill.add_subject(subject)
+
+        # add summary
+        if record.summary is not None:
+            bill.add_abstract(*record.summary)
+
+        # add titles
+        for title, title_type in record.titles:
+            bill.add_title(title, title_type)
+
+        # add other/related Bills
+        for identifier, session, indexed in record.related_bills:
+            bill.add_related_bill(identifier, legislative_session=session, relation_type='companion')
+            # related bills the index cannot confirm (yet) are left to pupa, and reported
+            if not indexed:
+                bill.extras.setdefault('unindexed-related-bills', []).append(
+                    {'identifier': identifier, 'legislative_session': session})
+
+        # add sponsor and cosponsors
+        for sponsorship in record.sponsorships:
+            bill.add_sponsorship_by_identifier(sponsorship.name, 'person', 'person', sponsorship.primary,
+                                               scheme='thomas_id', identifier=sponsorship.thomas_id,
+                                               chamber=record.chamber)
+
+        # add introduced_at and actions
+        bill.add_action('date of introduction', record.introduced_at, chamber=record.chamber, related_entities=[])
+
+        # add other actions
+        for action in record.actions:
+            bill.actions.append({'date': action.date,
+                                 'type': [action.type],
+                                 'description': action.description,
+                                 'actor': record.chamber,
+                                 'related_entities': []
+                                 })
+
+        # add bill versions
+        for version in record.versions:
+            bill.versions.append({'date': version.date,
+                                  'type': version.code,
+                                  'name': constants.VERSION_MAP[version.code],
+                                  'links': [{'mimetype': version.mimetype, 'url': version.url}]})
+
+        return bill
+
+    def _attach_texts(self, bills, bill_index):
+        """
+        Downloads the version documents of each bill with a bounded pool of workers into a BillTextStore, and
+        adds the SHA-1 of each document to its version link as 'sha1'. Documents whose url has already been
+        downloaded are skipped, and identical documents are stored once.
+
+        Downloads for the next bills are started while earlier ones finish, so bills are yielded in order with
+        at most a small window of them held back.
+
+        @param bills: converted bills
+        @type bills: generator[Bill]
+        @param bill_index: index the url -> hash mapping of downloaded documents is kept in
+        @type bill_index: BillIndex
+        @return: generator for the same bills, with hashes attached to their version links
+        @rtype: generator[Bill]
+        """
+        store = BillTextStore(self.text_store_dir)
+        window = deque()
+        in_flight = {}
+
+        def finish(bill, known):
+            for version in bill.versions:
+                for link in version['links']:
+                    url = link['url']
+                    if url in in_flight:
+                        content_hash = in_flight.pop(url).result()
+                        if content_hash is not None:
+                            bill_index.add_text(url, content_hash)
+                    else:
+                        # either downloaded before this run, or by an earlier bill sharing the url
+                        content_hash = known.get(url) or bill_index.text_hashes([url]).get(url)
+                    if content_hash is not None:
+                        link['sha1'] = content_hash
+            return bill
+
+        with ThreadPoolExecutor(max_workers=self.text_workers) as pool:
+            for bill in bills:
+                urls = [link['url'] for version in bill.versions for link in version['links']]
+                known = {url: content_hash for url, content_hash in bill_index.text_hashes(urls).items()
+                         if store.has(content_hash)}
+                for url in urls:
+                    if url not in known and url not in in_flight:
+                        in_flight[url] = pool.submit(store.download, url)
+                window.append((bill, known))
+                if len(window) > 4 * self.text_workers:
+                    yield finish(*window.popleft())
+            while window:
+                yield finish(*window.popleft())
+
+    def scrape(self, congress=None, bill_types=None, updated_since=None, fetch_text=None):
+        """
+        Scrapes bills, optionally narrowed by arguments passed on the pupa command line, e.g.
+        pupa update unitedstates bills congress=110-113 bill_types=hr,s updated_since=2014-06-01
+
+        @param congress: a congress (113) or an inclusive range of congresses (110-113)
+        @type congress: string
+        @param bill_types: comma separated bill types (hr,s)
+        @type bill_types: string
+        @param updated_since: date or datetime; only bills whose data changed since then are converted
+        @type updated_since: string
+        @param fetch_text: whether to download bill version documents (true/false)
+        @type fetch_text: string
+        @return: generator for federal US bills in OCD-compliant format
+        @rtype: generator
+        """
+        self._set_scope(congress, bill_types, updated_since, fetch_text)
+        yield from self._scrape_bills()
+
+    def _set_scope(self, congress=None, bill_types=None, updated_since=None, fetch_text=None):
+        """
+        Applies the string arguments of scrape() to the scraper's settings; arguments that are None are left alone.
+
+        @return: void
+        """
+        if congress is not None:
+            first, _, last = str(congress).partition('-')
+            self.congress_range = (int(first), int(last or first))
+        if bill_types is not None:
+            self.bill_types = [t.strip().lower() for t in bill_types.split(',') if t.strip()]
+        if updated_since is not None:
+            self.updated_since = date_parser.parse(updated_since)
+        if fetch_text is not None:
+            self.fetch_text = str(fetch_text).lower() in ('1', 'true', 'yes')
+
+
+def _list_dirs(path):
+    """
+    Lists the names of the subdirectories of path in sorted order, or none if path does not exist.
+
+    @param path: directory to list
+    @type path: string
+    @return: subdirectory names
+    @rtype: list[string]
+    """
+    try:
+        return sorted(entry.name for entry in os.scandir(path) if entry.is_dir())
+    except OSError:
+        return []
\ No newline at end of file
@@ -0,0 +1,199 @@
+import os
+import sqlite3
+
+from pupa import settings
+
+from . import constants
+from .util import datetime_to_date
+
+
+class BillIndex(object):
+    """
+    Local SQLite index of the bills converted by UnitedStatesBillScraper.
+
+    The bill scraper updates the index as it converts each data.json, so other scrapers can ask in bulk
+    whether referenced bills exist, and ad-hoc questions such as "bills changed since date X" can be
+    answered without re-reading any JSON.
+    """
+
+    FILENAME = 'bills.sqlite'
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS bills (
+            bill_id TEXT PRIMARY KEY,
+            congress INTEGER NOT NULL,
+            bill_type TEXT NOT NULL,
+            number INTEGER NOT NULL,
+            identifier TEXT NOT NULL,
+            title TEXT,
+            latest_action_date TEXT,
+            updated_at TEXT,
+            path TEXT NOT NULL,
+            hash TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS bills_identifier ON bills (identifier, congress);
+        CREATE INDEX IF NOT EXISTS bills_latest_action_date ON bills (latest_action_date);
+        CREATE TABLE IF NOT EXISTS texts (
+            url TEXT PRIMARY KEY,
+            hash TEXT NOT NULL
+        );
+    """
+
+    # rows written between commits, so concurrent readers see progress without a commit per bill
+    COMMIT_EVERY = 500
+
+    # sqlite caps the number of host parameters in a single statement
+    QUERY_CHUNK = 500
+
+    def __init__(self, path=None):
+        """
+        @param path: path of the SQLite file, defaults to bills.sqlite in the scraped data directory
+        @type path: string
+        """
+        self.path = path or os.path.join(settings.SCRAPED_DATA_DIR, self.FILENAME)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.connection = sqlite3.connect(self.path, timeout=30)
+        self.connection.executescript(self.SCHEMA)
+        self._pending = 0
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+    def commit(self):
+        self.connection.commit()
+        self._pending = 0
+
+    @staticmethod
+    def row(json_data, path, file_hash):
+        """
+        Builds the index row of a bill from its unitedstates data.json contents.
+
+        @param json_data: decoded unitedstates data.json of the bill
+        @type json_data: dict
+        @param path: path of the data.json file
+        @type path: string
+        @param file_hash: hash of the data.json file contents
+        @type file_hash: string
+        @return: row of the bills table
+        @rtype: tuple
+        """
+        actions = json_data.get('actions') or []
+        latest_action_date = max((datetime_to_date(a['acted_at']) for a in actions), default=None)
+        return (json_data['bill_id'], int(json_data['congress']), json_data['bill_type'], int(json_data['number']),
+                constants.TYPE_MAP[json_data['bill_type']]['canonical'] + ' ' + json_data['number'],
+                json_data.get('official_title'), latest_action_date, json_data.get('updated_at'), path, file_hash)
+
+    def add(self, json_data, path, file_hash):
+        """
+        Inserts or replaces the entry for a bill from its unitedstates data.json contents.
+
+        @param json_data: decoded unitedstates data.json of the bill
+        @type json_data: dict
+        @param path: path of the data.json file
+        @type path: string
+        @param file_hash: hash of the data.json file contents
+        @type file_hash: string
+        @return: void
+        """
+        self.add_row(self.row(json_data, path, file_hash))
+
+    def add_row(self, row):
+        """
+        Inserts or replaces the entry for a bill from a row built by BillIndex.row().
+
+        @param row: row of the bills table
+        @type row: tuple
+        @return: void
+        """
+        self.connection.execute('INSERT OR REPLACE INTO bills VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', row)
+        self._pending += 1
+        if self._pending >= self.COMMIT_EVERY:
+            self.commit()
+
+    def get_hash(self, bill_id):
+        """
+        @param bill_id: unitedstates bill id, e.g. hr1234-113
+        @type bill_id: string
+        @return: hash stored for the bill's data.json, or None if the bill is not indexed
+        @rtype: string
+        """
+        row = self.connection.execute('SELECT hash FROM bills WHERE bill_id = ?', (bill_id,)).fetchone()
+        return row[0] if row else None
+
+    def add_text(self, url, content_hash):
+        """
+        Records the content hash of a bill version document downloaded into the BillTextStore.
+
+        @param url: url the document was downloaded from
+        @type url: string
+        @param content_hash: SHA-1 hex digest of the document
+        @type content_hash: string
+        @return: void
+        """
+        self.connection.execute('INSERT OR REPLACE INTO texts VALUES (?, ?)', (url, content_hash))
+
+    def text_hashes(self, urls):
+        """
+        @param urls: urls of bill version documents
+        @type urls: iterable[string]
+        @return: url -> content hash for the documents that have already been downloaded
+        @rtype: dict
+        """
+        return dict(self._select_in('SELECT url, hash FROM texts', 'url', set(urls)))
+
+    def _select_in(self, query, column, values):
+        values = list(values)
+        for i in range(0, len(values), self.QUERY_CHUNK):
+            chunk = values[i:i + self.QUERY_CHUNK]
+            yield from self.connection.execute(
+                query + ' WHERE {0} IN ({1})'.format(column, ', '.join('?' * len(chunk))), chunk)
+
+    def resolve(self, bill_ids):
+        """
+        Looks up many unitedstates bill ids (the form used by related_bills, e.g. hr1234-113) at once.
+
+        @param bill_ids: unitedstates bill ids
+        @type bill_ids: iterable[string]
+        @return: bill id -> {'identifier': 'HR 1234', 'congress': '113'} for the bills that exist
+        @rtype: dict
+        """
+        return {row[0]: {'identifier': row[1], 'congress': str(row[2])}
+                for row in self._select_in('SELECT bill_id, identifier, congress FROM bills', 'bill_id', set(bill_ids))}
+
+    def resolve_identifiers(self, identifiers, congress):
+        """
+        Looks up many OCD bill identifiers (e.g. 'HR 1234', as built by bill_code_to_id) within one congress.
+
+        @param identifiers: OCD bill identifiers
+        @type identifiers: iterable[string]
+        @param congress: congress number
+        @type congress: string
+        @return: the subset of identifiers that exist in the given congress
+        @rtype: set[string]
+        """
+        rows = self._select_in('SELECT identifier, congress FROM bills', 'identifier', set(identifiers))
+        return {identifier for identifier, c in rows if str(c) == str(congress)}
+
+    def has_congress(self, congress):
+        """
+        @param congress: congress number
+        @type congress: string
+        @return: whether any bill of the congress has been indexed
+        @rtype: bool
+        """
+        return self.connection.execute('SELECT 1 FROM bills WHERE congress = ? LIMIT 1',
+                                       (int(congress),)).fetchone() is not None
+
+    def changed_since(self, date):
+        """
+        Lists bills whose latest action, or upstream update, is on or after the given date.
+
+        @param date: date string of form YYYY-mm-dd
+        @type date: string
+        @return: list of (bill id, latest action date, path) tuples, most recent first
+        @rtype: list[tuple]
+        """
+        return self.connection.execute(
+            'SELECT bill_id, latest_action_date, path FROM bills WHERE latest_action_date >= ? OR updated_at >= ? '
+            'ORDER BY latest_action_date DESC', (date, date)).fetchall()
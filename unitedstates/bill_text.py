@@ -0,0 +1,77 @@
+import os
+import hashlib
+import tempfile
+from http.client import HTTPException
+from urllib import request
+
+from pupa import settings
+
+
+class BillTextStore(object):
+    """
+    Content-addressed store of downloaded bill version documents.
+
+    Each document is stored once under its SHA-1 (root/ab/abcdef...), so identical documents published under
+    several formats or re-enrolled versions take up a single file.
+    """
+
+    DIRNAME = 'bill_texts'
+
+    # seconds to wait on a single document download
+    TIMEOUT = 60
+
+    def __init__(self, root=None):
+        """
+        @param root: directory of the store, defaults to bill_texts in the scraped data directory
+        @type root: string
+        """
+        self.root = root or os.path.join(settings.SCRAPED_DATA_DIR, self.DIRNAME)
+        os.makedirs(self.root, exist_ok=True)
+
+    def path_for(self, content_hash):
+        """
+        @param content_hash: SHA-1 hex digest of a document
+        @type content_hash: string
+        @return: path the document with the given hash is stored at
+        @rtype: string
+        """
+        return os.path.join(self.root, content_hash[:2], content_hash)
+
+    def has(self, content_hash):
+        return os.path.exists(self.path_for(content_hash))
+
+    def put(self, content):
+        """
+        Stores a document unless a document with the same contents is already present.
+
+        @param content: document contents
+        @type content: bytes
+        @return: SHA-1 hex digest of the contents
+        @rtype: string
+        """
+        content_hash = hashlib.sha1(content).hexdigest()
+        path = self.path_for(content_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # write to a temporary file first so concurrent writers never expose a partial document
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, 'wb') as tmp_file:
+                tmp_file.write(content)
+            os.replace(tmp_path, path)
+        return content_hash
+
+    def download(self, url):
+        """
+        Downloads a document and stores it. Safe to call from several threads at once.
+
+        @param url: url of the document
+        @type url: string
+        @return: SHA-1 hex digest of the document, or None if it could not be downloaded
+        @rtype: string
+        """
+        try:
+            with request.urlopen(url, timeout=self.TIMEOUT) as response:
+                return self.put(response.read())
+        except (IOError, ValueError, HTTPException):
+            print('Unable to download bill text from ' + url)
+            return None
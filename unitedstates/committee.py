@@ -1,12 +1,12 @@
 from pupa.scrape import Scraper, Organization
 from urllib import request
-import yaml
+
+from .util import load_yaml
 
 class UnitedStatesCommitteeScraper(Scraper):
     
     def fetch_yaml(self, source):
-        committee_string = request.urlopen(source)
-        return yaml.safe_load(committee_string)
+        return load_yaml(self, source, lambda u: request.urlopen(u).read())
     
     def scrape_committees(self, repos):
         for repo in repos:
@@ -39,6 +39,10 @@ PERSON_REGEX = re.compile('(' + '|'.join(NAME_PREFIX_LIST) +
                           '|'.join(CODE_TO_STATE.keys()) + ')(\))?')
 
 
+# earliest congress the unitedstates/congress project has bill data for
+FIRST_BILL_CONGRESS = 93
+
+
 # https://github.com/unitedstates/congress/wiki/bills#basic-information
 TYPE_MAP = {
      # "H.R. 1234". It stands for House of Representatives, but it is the prefix used for bills introduced in the House.
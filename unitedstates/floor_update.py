@@ -1,16 +1,19 @@
+import os
 import re
 import datetime
 import warnings
 
-import yaml
 from lxml import etree
 import pytz
 from unidecode import unidecode
 
+from pupa import settings
 from pupa.utils import make_pseudo_id
 from pupa.scrape import Scraper, Event
 
 from .constants import BILL_REGEX
+from .util import load_yaml
+from .bill_index import BillIndex
 
 
 def bill_code_to_id(code):
@@ -28,6 +31,9 @@ class UnitedStatesFloorUpdateScraper(Scraper):
     HOUSE_BASE_URL = 'http://clerk.house.gov/floorsummary'
     HOUSE_BACKSEARCH_DAYS = 90
 
+    # path of the bill scraper's local bill index, defaults to bills.sqlite in the scraped data directory
+    bill_index_path = None
+
     def _html_scrape_and_parse(self, url):
         """
         Convenience shortcut for retrieving HTML and parsing it using lxml.
@@ -77,9 +83,32 @@ class UnitedStatesFloorUpdateScraper(Scraper):
         @rtype: list[string]
         """
         url = 'https://raw.githubusercontent.com/unitedstates/congress-legislators/master/committees-current.yaml'
-        yml = yaml.safe_load(self.get(url).text)
+        yml = load_yaml(self, url, lambda u: self.get(u).text)
         return [item['name'] for item in yml if item['type'] == 'house']
 
+    def _known_bill_ids(self, bill_ids, congress):
+        """
+        Resolves bill identifiers against the bill scraper's local BillIndex in one query. The index is read as it
+        stands, i.e. as left by earlier bill runs plus whatever a concurrently running bill scrape has committed.
+
+        @param bill_ids: OCD bill identifiers, e.g. 'HR 1234'
+        @type bill_ids: iterable[string]
+        @param congress: congress the identifiers belong to
+        @type congress: string
+        @return: the identifiers known to exist, or None if the index has no bills for the congress
+        @rtype: set[string]
+        """
+        path = self.bill_index_path or os.path.join(settings.SCRAPED_DATA_DIR, BillIndex.FILENAME)
+        if not os.path.exists(path):
+            return None
+        bill_index = BillIndex(path)
+        try:
+            if not bill_index.has_congress(congress):
+                return None
+            return bill_index.resolve_identifiers(bill_ids, congress)
+        finally:
+            bill_index.close()
+
     def _public_law_detail_scraper(self, **kwargs):
         """
         Retrieves the bill identifier and congress number from its public_law content detail page.
@@ -135,6 +164,8 @@ class UnitedStatesFloorUpdateScraper(Scraper):
         congress = tree.xpath('.//legislative_congress')[0].get('congress')
 
         house_committees = self._get_current_house_committee_names()
+        known_bills = self._known_bill_ids({bill_code_to_id(bill.xpath('string()'))
+                                            for bill in tree.xpath(".//a[@rel='bill']")}, congress)
         for fa in tree.xpath('.//floor_action'):
             fa_text = fa.xpath('.//action_description')[0].xpath('string()')
 
@@ -161,8 +192,13 @@ class UnitedStatesFloorUpdateScraper(Scraper):
             ai_b = event.add_agenda_item(description='Bills referenced by this update.')
             for bill in fa.xpath(".//a[@rel='bill']"):
                 bill_name = bill.xpath('string()')
-                ai_b.add_bill(bill_name, id=make_pseudo_id(identifier=bill_code_to_id(bill_name), congress=congress),
+                bill_id = bill_code_to_id(bill_name)
+                ai_b.add_bill(bill_name, id=make_pseudo_id(identifier=bill_id, congress=congress),
                               note="Bill was referenced on the House floor.")
+                # the index may be stale or scoped, so it only reports references it cannot confirm yet;
+                # resolving them is left to pupa
+                if known_bills is not None and bill_id not in known_bills:
+                    event.extras.setdefault('unindexed-bills', []).append(bill_id)
 
             # publaws
             ai_p = event.add_agenda_item(description='Public laws referenced by this update.')
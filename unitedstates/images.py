@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import random
+import tempfile
+from urllib import request
+from urllib.error import HTTPError
+from concurrent.futures import ThreadPoolExecutor
+
+from pupa import settings
+
+
+class LegislatorImages(object):
+    """
+    Verifies which legislator portraits exist in the unitedstates/images repository.
+
+    Portraits are checked with concurrent HEAD requests and the outcome is cached in a JSON file together with
+    each response's ETag. Cached outcomes are trusted for a while and then revalidated. Missing portraits, the
+    common case for historical legislators and rarely added later, are trusted for months, and every expiry is
+    randomised so revalidation is spread over many runs; a run with a warm cache makes few or no requests.
+    """
+
+    BASE_URL = 'https://raw.githubusercontent.com/unitedstates/images/gh-pages/congress/'
+
+    # sizes in order of preference
+    SIZES = ('450x550', '225x275', 'original')
+
+    FILENAME = 'legislator_images.json'
+
+    # seconds a cached outcome is trusted before it is revalidated, randomised down to half of this
+    MAX_AGE = 7 * 24 * 60 * 60
+    MISSING_MAX_AGE = 180 * 24 * 60 * 60
+
+    # seconds to wait on a single request
+    TIMEOUT = 30
+
+    def __init__(self, path=None, workers=16):
+        """
+        @param path: path of the cache file, defaults to legislator_images.json in the scraped data directory
+        @type path: string
+        @param workers: number of concurrent requests
+        @type workers: int
+        """
+        self.path = path or os.path.join(settings.SCRAPED_DATA_DIR, self.FILENAME)
+        self.workers = workers
+        try:
+            with open(self.path) as cache_file:
+                self.cache = json.load(cache_file)
+        except (IOError, ValueError):
+            self.cache = {}
+
+    def url(self, bioguide, size):
+        return self.BASE_URL + size + '/' + bioguide + '.jpg'
+
+    def save(self):
+        """
+        Writes the cache file, replacing it atomically.
+
+        @return: void
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, 'w') as tmp_file:
+            json.dump(self.cache, tmp_file)
+        os.replace(tmp_path, self.path)
+
+    def _entry(self, exists, etag):
+        """
+        @param exists: whether the image exists
+        @type exists: bool
+        @param etag: ETag of the image, if any
+        @type etag: string
+        @return: cached outcome of a check, with a randomised expiry
+        @rtype: dict
+        """
+        now = time.time()
+        max_age = self.MAX_AGE if exists else self.MISSING_MAX_AGE
+        return {'exists': exists, 'etag': etag, 'checked': now, 'expires': now + max_age * random.uniform(0.5, 1)}
+
+    def _is_fresh(self, entry, now):
+        # entries cached before expiries were stored are revalidated
+        return now < entry.get('expires', 0)
+
+    def _check(self, url, entry):
+        """
+        Checks whether the image at url exists, revalidating a previous outcome when there is one.
+
+        @param url: url of the image
+        @type url: string
+        @param entry: cached outcome for the url, or None
+        @type entry: dict
+        @return: new cached outcome, or the previous one (possibly None) if the request failed
+        @rtype: dict
+        """
+        req = request.Request(url, method='HEAD')
+        if entry is not None and entry.get('etag'):
+            req.add_header('If-None-Match', entry['etag'])
+        try:
+            with request.urlopen(req, timeout=self.TIMEOUT) as response:
+                return self._entry(True, response.headers.get('ETag'))
+        except HTTPError as e:
+            if e.code == 304:
+                return self._entry(entry['exists'], entry['etag'])
+            if e.code in (404, 410):
+                return self._entry(False, None)
+            # anything else, including the 403 GitHub answers when throttling, says nothing about the image
+            return entry
+        except (IOError, ValueError):
+            return entry
+
+    def find(self, bioguides):
+        """
+        Finds the preferred existing portrait size for each bioguide. Each size is checked concurrently for every
+        bioguide still without a portrait, so smaller sizes are only requested when larger ones are missing.
+
+        @param bioguides: bioguides of legislators
+        @type bioguides: iterable[string]
+        @return: bioguide -> image url, for the bioguides that have a portrait
+        @rtype: dict
+        """
+        remaining = set(bioguides)
+        images = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for size in self.SIZES:
+                now = time.time()
+                stale = {}
+                for bioguide in remaining:
+                    url = self.url(bioguide, size)
+                    entry = self.cache.get(url)
+                    if entry is None or not self._is_fresh(entry, now):
+                        stale[url] = pool.submit(self._check, url, entry)
+                for url, future in stale.items():
+                    entry = future.result()
+                    if entry is not None:
+                        self.cache[url] = entry
+                for bioguide in list(remaining):
+                    url = self.url(bioguide, size)
+                    entry = self.cache.get(url)
+                    if entry is not None and entry['exists']:
+                        images[bioguide] = url
+                        remaining.discard(bioguide)
+        return images
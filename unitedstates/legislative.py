@@ -2,14 +2,20 @@ from pupa.scrape import Scraper, Person, Membership, Organization, Post
 from pupa.utils import make_pseudo_id
 
 from collections import defaultdict
-import yaml
+
+from .util import load_yaml
+from .images import LegislatorImages
 
 
 class UnitedStatesLegislativeScraper(Scraper):
 
+    # path of the portrait verification cache, defaults to legislator_images.json in the scraped data directory
+    image_cache_path = None
+    # number of concurrent portrait checks
+    image_workers = 16
+
     def yamlize(self, url):
-        resp = self.get(url)
-        return yaml.safe_load(resp.text)
+        return load_yaml(self, url, lambda u: self.get(u).text)
 
     def get_url(self, what):
         return ('https://raw.githubusercontent.com/'
@@ -17,20 +23,20 @@ class UnitedStatesLegislativeScraper(Scraper):
               + what
               + '.yaml')
 
-    def get_image_url(self, bioguide, size='450x550'):
+    def find_image_urls(self, people):
         """
-        Gets the url for the image of a legislator with input bioguide.
-
-        @param bioguide: bioguide of legislator
-        @type bioguide: string
-        @param size: the size of the desired image (225x275, 450x550)
-        @type size: string
-        @return: url of photo on github
-        @rtype: string
+        Verifies which of the given legislators have a portrait, using a persistent LegislatorImages cache.
+
+        @param people: legislators as loaded from congress-legislators YAML
+        @type people: list[dict]
+        @return: bioguide -> url of the preferred existing portrait size
+        @rtype: dict
         """
-        return ('https://raw.githubusercontent.com/unitedstates/images/gh-pages/congress/'
-              + size + '/'
-              + bioguide + '.jpg')
+        images = LegislatorImages(self.image_cache_path, workers=self.image_workers)
+        found = images.find(str(person['id']['bioguide']) for person in people
+                            if 'bioguide' in person.get('id', {}))
+        images.save()
+        return found
 
     def scrape_current_chambers(self):
         CURRENT_LEGISLATORS = self.get_url('legislators-current')
@@ -56,6 +62,7 @@ class UnitedStatesLegislativeScraper(Scraper):
             CURRENT_LEGISLATORS = self.get_url(repo)
 
             people = self.yamlize(CURRENT_LEGISLATORS)
+            image_urls = self.find_image_urls(people)
             parties = set()
             posts = {}
             person_cache = defaultdict(lambda: defaultdict(lambda: None))
@@ -141,8 +148,8 @@ class UnitedStatesLegislativeScraper(Scraper):
                             who.add_identifier(str(v), scheme=key)
                     else:
                         who.add_identifier(str(value), scheme=key)
-                        if key == 'bioguide':
-                            who.image = self.get_image_url(str(value))
+                        if key == 'bioguide' and str(value) in image_urls:
+                            who.image = image_urls[str(value)]
 
                 if has_term:
                     yield who
@@ -0,0 +1,200 @@
+"""
+Runs the UnitedStates scrapers concurrently in a single invocation.
+
+`pupa update` runs each scraper in turn, so a full run costs the sum of all of them even though the bill
+scraper is dominated by subprocess and disk work while the others mostly wait on the network. This runner
+executes them on threads instead, writing to the same data directory `pupa update` uses, so the result can
+be imported afterwards with `pupa update unitedstates --import`.
+
+    python -m unitedstates.runner [congress bills committees floor_updates] [--fastmode]
+
+As with `pupa update`, key=value arguments following a scraper's name are passed to that scraper:
+
+    python -m unitedstates.runner congress committees bills congress=113 bill_types=hr,s floor_updates
+"""
+import os
+import glob
+import argparse
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from pupa import settings
+from pupa.scrape import JurisdictionScraper
+
+from . import UnitedStates
+from .util import SharedYamlCache
+
+
+# scraper name -> scrapers whose output it builds on. Legislators and committees feed sponsor and committee
+# resolution, so bills and floor updates are only converted once those have finished. Floor updates do not
+# wait for bills: they resolve bill references against the BillIndex as left by earlier bill runs.
+DEPENDENCIES = {
+    'congress': (),
+    'committees': (),
+    'bills': ('congress', 'committees'),
+    'floor_updates': ('committees',),
+}
+
+
+def dependency_order(names, dependencies=DEPENDENCIES):
+    """
+    Orders scraper names so that every scraper comes after the scrapers it depends on. Dependencies on
+    scrapers that are not part of this run are ignored.
+
+    @param names: scraper names to run
+    @type names: list[string]
+    @param dependencies: scraper name -> names of the scrapers it depends on
+    @type dependencies: dict
+    @return: scraper names in dependency order
+    @rtype: list[string]
+    """
+    ordered = []
+    visiting = set()
+
+    def visit(name):
+        if name in ordered:
+            return
+        if name in visiting:
+            raise ValueError('Circular scraper dependency involving ' + name)
+        visiting.add(name)
+        for dep in dependencies.get(name, ()):
+            if dep in names:
+                visit(dep)
+        visiting.remove(name)
+        ordered.append(name)
+
+    for name in names:
+        visit(name)
+    return ordered
+
+
+def parse_scraper_args(tokens):
+    """
+    Parses scraper names, each optionally followed by key=value arguments, the way `pupa update` does.
+
+    @param tokens: command line tokens, e.g. ['bills', 'congress=113', 'floor_updates']
+    @type tokens: list[string]
+    @return: scraper name -> keyword arguments for its scrape(), in command line order
+    @rtype: OrderedDict
+    """
+    scrapers = OrderedDict()
+    name = None
+    for token in tokens:
+        if '=' in token:
+            if name is None:
+                raise ValueError('argument {0} does not follow a scraper name'.format(token))
+            key, value = token.split('=', 1)
+            scrapers[name][key] = value
+        else:
+            name = token
+            scrapers.setdefault(name, {})
+    return scrapers
+
+
+def run_scrapers(jurisdiction, datadir, names=None, dependencies=DEPENDENCIES, scrape_args=None, **kwargs):
+    """
+    Runs the jurisdiction's scrapers concurrently, respecting dependencies between them.
+
+    Like the scrape step of `pupa update`, the run first clears scraped JSON left in datadir by earlier runs and
+    saves the jurisdiction itself (through JurisdictionScraper), so datadir can be imported on its own.
+
+    Every scraper's optional prepare() step (e.g. the upstream unitedstates/congress run of the bill scraper)
+    starts immediately; its do_scrape() starts as soon as its own preparation and all of its dependencies
+    have finished. Dependencies only order the run (pupa resolves references at import time), so a failing
+    scraper does not stop the scrapers depending on it; every scraper runs and failures are reported per
+    scraper. All scrapers share one SharedYamlCache, so upstream YAML needed by several of them is
+    fetched once. Total wall time therefore approaches that of the slowest scraper rather than the sum.
+
+    @param jurisdiction: jurisdiction whose scrapers to run
+    @type jurisdiction: Jurisdiction
+    @param datadir: directory scraped objects are saved to
+    @type datadir: string
+    @param names: scraper names to run, defaults to all of the jurisdiction's scrapers
+    @type names: list[string]
+    @param dependencies: scraper name -> names of the scrapers it depends on
+    @type dependencies: dict
+    @param scrape_args: scraper name -> keyword arguments passed to its prepare() and do_scrape()
+    @type scrape_args: dict
+    @param kwargs: extra keyword arguments passed to each scraper's constructor (e.g. fastmode)
+    @type kwargs: dict
+    @return: scraper name -> record returned by its do_scrape() (including 'jurisdiction'), and
+        scraper name -> exception raised by its prepare() or do_scrape(), for the scrapers that failed
+    @rtype: tuple[dict, dict]
+    """
+    names = dependency_order(list(names or jurisdiction.scrapers), dependencies)
+    scrape_args = scrape_args or {}
+
+    # clear json from earlier runs, then do the jurisdiction, as pupa update does
+    for filename in glob.glob(os.path.join(datadir, '*.json')):
+        os.remove(filename)
+    jurisdiction_record = JurisdictionScraper(jurisdiction, datadir, **kwargs).do_scrape()
+
+    cache = SharedYamlCache()
+    scrapers = {}
+    for name in names:
+        scraper = jurisdiction.scrapers[name](jurisdiction, datadir, **kwargs)
+        scraper.yaml_cache = cache
+        scrapers[name] = scraper
+
+    # one thread per prepare step and one per scrape, so a scrape blocked on its dependencies never
+    # starves the pool
+    with ThreadPoolExecutor(max_workers=2 * len(names)) as pool:
+        prepared = {}
+        for name in names:
+            prepare = getattr(scrapers[name], 'prepare', None)
+            if prepare is not None:
+                prepared[name] = pool.submit(prepare, **scrape_args.get(name, {}))
+
+        def run(name):
+            if name in prepared:
+                prepared[name].result()
+            # wait for dependencies to finish, whether or not they succeeded
+            for dep in dependencies.get(name, ()):
+                if dep in scraped:
+                    scraped[dep].exception()
+            return scrapers[name].do_scrape(**scrape_args.get(name, {}))
+
+        scraped = {}
+        # submitted in dependency order, so every dependency's future exists before its dependents run
+        for name in names:
+            scraped[name] = pool.submit(run, name)
+
+    records = {'jurisdiction': jurisdiction_record}
+    errors = {}
+    for name in names:
+        error = scraped[name].exception()
+        if error is None:
+            records[name] = scraped[name].result()
+        else:
+            errors[name] = error
+    return records, errors
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the UnitedStates scrapers concurrently.')
+    parser.add_argument('scrapers', nargs='*',
+                        help='scrapers to run (default: all), each followed by key=value arguments for it')
+    parser.add_argument('--fastmode', action='store_true', help='use cache and turn off throttling')
+    parser.add_argument('--nostrict', action='store_false', dest='strict', help='skip validation on save')
+    args = parser.parse_args()
+    try:
+        scrape_args = parse_scraper_args(args.scrapers)
+    except ValueError as e:
+        parser.error(str(e))
+
+    jurisdiction = UnitedStates()
+    datadir = os.path.join(settings.SCRAPED_DATA_DIR, 'unitedstates')
+    os.makedirs(datadir, exist_ok=True)
+
+    records, errors = run_scrapers(jurisdiction, datadir, list(scrape_args), scrape_args=scrape_args,
+                                   strict_validation=args.strict, fastmode=args.fastmode)
+    for name, record in records.items():
+        print('{0}: {1} - {2}'.format(name, record['start'], record['end']))
+        for _type, count in sorted(record['objects'].items()):
+            print('    {0}: {1}'.format(_type, count))
+    for name, error in errors.items():
+        print('{0} failed:'.format(name))
+        print(''.join(traceback.format_exception(type(error), error, error.__traceback__)))
+    if errors:
+        raise SystemExit(1)
@@ -1,5 +1,9 @@
 import os
 import re
+import sys
+import threading
+
+import yaml
 
 
 def find_files(directory, pattern):
@@ -32,6 +36,66 @@ def datetime_to_date(datetime_str):
     return datetime_str.split('T')[0] if 'T' in datetime_str else datetime_str
 
 
+def intern_str(value):
+    """
+    Interns strings so recurring values share one object; anything else (e.g. None) is returned unchanged.
+
+    @param value: value to intern
+    @type value: object
+    @return: the interned string, or value itself if it is not a string
+    @rtype: object
+    """
+    return sys.intern(value) if type(value) is str else value
+
+
+class SharedYamlCache(object):
+    """
+    Thread-safe cache of parsed upstream YAML documents, keyed by url.
+
+    Scrapers running side by side (see unitedstates.runner) share one instance so that a document such as
+    committees-current.yaml is fetched and parsed once per run, no matter how many scrapers ask for it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, url, fetch):
+        """
+        Returns the parsed YAML at url, calling fetch(url) for the raw document only on first use.
 
+        @param url: url of the YAML document
+        @type url: string
+        @param fetch: callable returning the raw document (string or bytes) for a url
+        @type fetch: callable
+        @return: parsed YAML document
+        @rtype: list or dict
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                entry = self._entries[url] = {'lock': threading.Lock()}
+        # per-url lock so concurrent callers wait for the first fetch instead of repeating it
+        with entry['lock']:
+            if 'data' not in entry:
+                entry['data'] = yaml.safe_load(fetch(url))
+        return entry['data']
 
 
+def load_yaml(scraper, url, fetch):
+    """
+    Loads upstream YAML through the scraper's shared cache when one is attached, or directly otherwise.
+
+    @param scraper: scraper instance, optionally carrying a yaml_cache attribute
+    @type scraper: Scraper
+    @param url: url of the YAML document
+    @type url: string
+    @param fetch: callable returning the raw document for a url
+    @type fetch: callable
+    @return: parsed YAML document
+    @rtype: list or dict
+    """
+    cache = getattr(scraper, 'yaml_cache', None)
+    if cache is None:
+        return yaml.safe_load(fetch(url))
+    return cache.get(url, fetch)